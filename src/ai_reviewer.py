@@ -1,71 +1,146 @@
 """AI-powered code review using the Google Gemini API."""
 
-import json
+import asyncio
+import atexit
+import functools
+import hashlib
 import os
+import re
+import sys
+from collections.abc import Iterator
 
-import google.generativeai as genai
-from dotenv import load_dotenv
+import orjson
 
+from . import llm_cache
 from .models import Problem
 
-load_dotenv()
+MODEL_ID = "gemini-2.5-flash"
+# Bump whenever the prompt text changes so cached reviews are invalidated.
+PROMPT_VERSION = "v2"
+# Keeps batch reviews within Gemini's per-minute request limits.
+MAX_CONCURRENT_REVIEWS = 10
 
-REVIEW_PROMPT = """\
-You are an expert coding interview reviewer. Analyze the submitted solution and provide constructive feedback.
+# ~50k tokens; larger files exceed what gemini-flash reviews usefully.
+MAX_CODE_CHARS = 200_000
+# Line-comment markers per language, for spotting comment-only submissions.
+COMMENT_PREFIXES = {
+    "python": ("#",),
+    "rb": ("#",),
+    "js": ("//",),
+    "ts": ("//",),
+    "java": ("//",),
+    "c": ("//",),
+    "cpp": ("//",),
+    "cs": ("//",),
+    "go": ("//",),
+    "rs": ("//",),
+    "kt": ("//",),
+    "swift": ("//",),
+}
 
-You MUST respond with valid JSON only — no markdown, no code fences, no extra text. Use this exact schema:
+_loop: asyncio.AbstractEventLoop | None = None
+_api_key_cache: str | None = None
 
-{{
-  "feedback": "Your detailed review (under 250 words). Be encouraging but honest. Mention what's done well, then give 1-2 specific improvements.",
-  "passed": true or false,
-  "time_complexity": "O(...)",
-  "space_complexity": "O(...)"
-}}
+REVIEW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "feedback": {
+            "type": "string",
+            "description": "Detailed review under 250 words. Mention what's done well, then give 1-2 specific improvements.",
+        },
+        "passed": {"type": "boolean"},
+        "time_complexity": {"type": "string", "description": "Big-O time complexity, e.g. O(n)."},
+        "space_complexity": {"type": "string", "description": "Big-O space complexity, e.g. O(1)."},
+    },
+    "required": ["feedback", "passed", "time_complexity", "space_complexity"],
+}
 
-Rules for "passed":
-- true if the solution correctly solves the problem for typical inputs
-- false if there are logical errors, missing edge cases, or it doesn't solve the problem
+# Structured output: Gemini returns JSON matching REVIEW_SCHEMA, no fences to strip.
+GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": REVIEW_SCHEMA,
+}
 
-## Problem: {title} ({difficulty})
+# Start of the feedback value in a (possibly partial) streamed reply
+_FEEDBACK_START = re.compile(r'"feedback"\s*:\s*"')
 
-{description}
+# The prompt is split around the per-call fields so the large static parts
+# are plain constants rather than a template re-parsed on every call.
+_REVIEW_PROMPT_HEADER = sys.intern("""\
+You are an expert coding interview reviewer. Analyze the submitted solution and provide constructive feedback.
 
-## Submitted Solution ({language}):
+Rules for "passed":
+- true if the solution correctly solves the problem for typical inputs
+- false if there are logical errors, missing edge cases, or it doesn't solve the problem
 
-```{language}
-{code}
-```
+""")
 
+_REVIEW_PROMPT_FOOTER = sys.intern("""
 Evaluate:
 1. Correctness — does it solve the problem?
 2. Edge cases handled?
 3. One specific improvement suggestion.
 Be encouraging but honest.
-"""
+""")
 
 
-def _strip_markdown_fences(text: str) -> str:
-    """Remove ```json ... ``` wrappers that Gemini sometimes adds."""
-    text = text.strip()
-    if text.startswith("```"):
-        # Remove opening fence line
-        text = text.split("\n", 1)[1] if "\n" in text else text[3:]
-    if text.endswith("```"):
-        text = text[:-3]
-    return text.strip()
+def _build_prompt(problem: Problem, code: str, language: str) -> str:
+    return (
+        f"{_REVIEW_PROMPT_HEADER}"
+        f"## Problem: {problem.title} ({problem.difficulty})\n\n"
+        f"{problem.description}\n\n"
+        f"## Submitted Solution ({language}):\n\n"
+        f"```{language}\n{code}\n```\n"
+        f"{_REVIEW_PROMPT_FOOTER}"
+    )
 
 
-def review_code(problem: Problem, code: str, language: str = "python") -> dict:
-    """Submit code to Gemini for review and return structured feedback.
+def _cache_key(problem: Problem, code: str, language: str) -> str:
+    """Cache key for a review; includes model and prompt version so either change invalidates it."""
+    parts = [MODEL_ID, PROMPT_VERSION, language, problem.id, code]
+    return hashlib.sha256(b"\x00".join(p.encode() for p in parts)).hexdigest()
 
-    Returns:
-        dict with keys: feedback (str), passed (bool),
-        time_complexity (str), space_complexity (str)
 
-    Raises:
-        ValueError: If GOOGLE_API_KEY is not set.
-    """
-    api_key = os.environ.get("GOOGLE_API_KEY")
+def _rejected_review(feedback: str) -> dict:
+    return {
+        "feedback": feedback,
+        "passed": False,
+        "time_complexity": "Unknown",
+        "space_complexity": "Unknown",
+    }
+
+
+def _preflight(code: str, language: str) -> dict | None:
+    """Return a review for submissions that don't need the API, or None to review normally."""
+    stripped = code.strip()
+    if not stripped:
+        return _rejected_review("Empty submission.")
+    if len(code) > MAX_CODE_CHARS:
+        return _rejected_review("Solution too large to review.")
+
+    prefixes = COMMENT_PREFIXES.get(language)
+    if prefixes and all(
+        line.lstrip().startswith(prefixes) for line in stripped.splitlines() if line.strip()
+    ):
+        return _rejected_review("Submission contains only comments — no code to review.")
+    return None
+
+
+def _get_api_key() -> str | None:
+    """Read GOOGLE_API_KEY, loading .env only until a key has been found."""
+    global _api_key_cache
+    if _api_key_cache is not None:
+        return _api_key_cache
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    _api_key_cache = os.environ.get("GOOGLE_API_KEY")
+    return _api_key_cache
+
+
+def _require_api_key() -> str:
+    api_key = _get_api_key()
     if not api_key:
         raise ValueError(
             "GOOGLE_API_KEY not set. "
@@ -73,36 +148,167 @@ def review_code(problem: Problem, code: str, language: str = "python") -> dict:
             "  1. Copy .env.example to .env\n"
             "  2. Add your key: GOOGLE_API_KEY=AIza..."
         )
+    return api_key
+
+
+@functools.lru_cache(maxsize=4)
+def _get_model(model_id: str, api_key: str):
+    """Configure the SDK and build a model once per (model, key) pair."""
+    # Imported here so commands that never call the API skip loading the Gemini SDK.
+    import google.generativeai as genai
 
     genai.configure(api_key=api_key)
-    model = genai.GenerativeModel("gemini-2.5-flash")
-
-    prompt = REVIEW_PROMPT.format(
-        title=problem.title,
-        difficulty=problem.difficulty,
-        description=problem.description,
-        language=language,
-        code=code,
-    )
+    return genai.GenerativeModel(model_id)
 
-    response = model.generate_content(prompt)
-    raw = response.text
 
-    cleaned = _strip_markdown_fences(raw)
+def _run(coro):
+    """Run coro on one process-wide event loop.
+
+    The SDK's async client holds a gRPC channel bound to the loop it was
+    created on; reusing the loop lets every review share that connection
+    instead of reconnecting per asyncio.run call.
+    """
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+        atexit.register(_loop.close)
+    return _loop.run_until_complete(coro)
 
-    try:
-        result = json.loads(cleaned)
-    except json.JSONDecodeError:
-        return {
-            "feedback": raw,
-            "passed": False,
-            "time_complexity": "Unknown",
-            "space_complexity": "Unknown",
-        }
 
+def parse_review(raw: str) -> dict:
+    """Parse a complete model reply into a review dict.
+
+    Raises:
+        ValueError: If the reply is not valid JSON.
+    """
+    result = orjson.loads(raw)
     return {
-        "feedback": result.get("feedback", raw),
-        "passed": bool(result.get("passed", False)),
-        "time_complexity": result.get("time_complexity", "Unknown"),
-        "space_complexity": result.get("space_complexity", "Unknown"),
+        "feedback": result["feedback"],
+        "passed": bool(result["passed"]),
+        "time_complexity": result["time_complexity"],
+        "space_complexity": result["space_complexity"],
     }
+
+
+def partial_feedback(raw: str) -> str:
+    """Return as much of the "feedback" string as has arrived in a partial JSON reply.
+
+    Returns "" until the feedback value has started.
+    """
+    match = _FEEDBACK_START.search(raw)
+    if match is None:
+        return ""
+
+    # The value runs to the first unescaped quote, or to the end of what has streamed so far
+    body = raw[match.end():]
+    i = 0
+    while i < len(body) and body[i] != '"':
+        i += 2 if body[i] == "\\" else 1
+    body = body[:i]
+
+    # A chunk can end mid-escape (a lone backslash or a partial \u sequence); trim until it decodes
+    for cut in range(6):
+        try:
+            return orjson.loads(f'"{body[:len(body) - cut]}"')
+        except orjson.JSONDecodeError:
+            continue
+    return ""
+
+
+async def review_code_async(problem: Problem, code: str, language: str = "python") -> dict:
+    """Async variant of review_code; lets several reviews share one event loop."""
+    rejected = _preflight(code, language)
+    if rejected is not None:
+        return rejected
+
+    api_key = _require_api_key()
+
+    prompt = _build_prompt(problem, code, language)
+
+    key = _cache_key(problem, code, language)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+
+    model = _get_model(MODEL_ID, api_key)
+
+    response = await model.generate_content_async(prompt, generation_config=GENERATION_CONFIG)
+    result = parse_review(response.text)
+
+    llm_cache.put(key, result, model_id=MODEL_ID, prompt_version=PROMPT_VERSION)
+    return result
+
+
+def review_code(problem: Problem, code: str, language: str = "python") -> dict:
+    """Submit code to Gemini for review and return structured feedback.
+
+    Returns:
+        dict with keys: feedback (str), passed (bool),
+        time_complexity (str), space_complexity (str)
+
+    Raises:
+        ValueError: If GOOGLE_API_KEY is not set or the reply is not valid JSON.
+    """
+    return _run(review_code_async(problem, code, language))
+
+
+def review_code_stream(
+    problem: Problem, code: str, language: str = "python"
+) -> Iterator[str]:
+    """Yield the model's reply in chunks as they arrive.
+
+    The chunks concatenate to the full JSON reply; pass that to parse_review
+    once the stream is exhausted. Partial buffers are not valid JSON.
+
+    Raises:
+        ValueError: If GOOGLE_API_KEY is not set or the full reply is not valid JSON.
+    """
+    rejected = _preflight(code, language)
+    if rejected is not None:
+        yield orjson.dumps(rejected).decode()
+        return
+
+    api_key = _require_api_key()
+
+    prompt = _build_prompt(problem, code, language)
+
+    key = _cache_key(problem, code, language)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        yield orjson.dumps(cached).decode()
+        return
+
+    model = _get_model(MODEL_ID, api_key)
+
+    buffer = []
+    for chunk in model.generate_content(prompt, generation_config=GENERATION_CONFIG, stream=True):
+        buffer.append(chunk.text)
+        yield chunk.text
+
+    result = parse_review("".join(buffer))
+    llm_cache.put(key, result, model_id=MODEL_ID, prompt_version=PROMPT_VERSION)
+
+
+async def _gather_reviews(items: list[tuple[Problem, str, str]]) -> list:
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REVIEWS)
+
+    async def review_one(problem: Problem, code: str, language: str) -> dict:
+        async with semaphore:
+            return await review_code_async(problem, code, language)
+
+    return await asyncio.gather(
+        *(review_one(*item) for item in items), return_exceptions=True
+    )
+
+
+def bulk_review(problems_codes: list[tuple[Problem, str, str]]) -> list[dict | Exception]:
+    """Review many (problem, code, language) triples concurrently.
+
+    Results are returned in input order. A review that fails is returned as
+    its exception instead of aborting the whole batch.
+
+    Raises:
+        ValueError: If GOOGLE_API_KEY is not set.
+    """
+    _require_api_key()
+    return _run(_gather_reviews(problems_codes))
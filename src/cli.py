@@ -1,9 +1,14 @@
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
 import typer
-from rich.console import Console
+from pygments.lexer import Lexer
+from pygments.lexers import get_lexer_by_name
+from pygments.util import ClassNotFound
+from rich.console import Console, Group
+from rich.live import Live
 from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.prompt import Prompt
@@ -20,25 +25,40 @@ console = Console()
 DIFFICULTY_COLORS = {"easy": "green", "medium": "yellow", "hard": "red"}
 
 
+# Shared instances: callers must not mutate the returned Text (append_text copies, so headers are safe).
+_DIFFICULTY_TEXTS = {d: Text(d.upper(), style=f"bold {c}") for d, c in DIFFICULTY_COLORS.items()}
+
+
 def _difficulty_text(difficulty: str) -> Text:
-    color = DIFFICULTY_COLORS.get(difficulty, "white")
-    return Text(difficulty.upper(), style=f"bold {color}")
+    return _DIFFICULTY_TEXTS.get(difficulty) or Text(difficulty.upper(), style="bold white")
+
+
+@lru_cache(maxsize=16)
+def _lexer_for(language: str) -> Lexer | str:
+    """Look up the Pygments lexer for a language once per process.
+
+    Uses the options Syntax applies to lexers it builds itself, so blank lines at the
+    start and end of the file are kept and line numbers match the user's file.
+    """
+    try:
+        return get_lexer_by_name(language, stripnl=False, ensurenl=True, tabsize=4)
+    except ClassNotFound:
+        return language  # Syntax falls back to plain text for unknown names
 
 
 def _display_problem(problem: Problem):
     difficulty = _difficulty_text(problem.difficulty)
     tags = " ".join(f"[dim]\\[{t}][/dim]" for t in problem.tags)
 
-    header = Text()
-    header.append(problem.title, style="bold")
-    header.append("  ")
-    header.append_text(difficulty)
+    header = Text.assemble((problem.title, "bold"), "  ", difficulty)
 
     body = f"{tags}\n\n{problem.description}" if tags else problem.description
 
-    console.print()
-    console.print(Panel(body, title=header, title_align="left", border_style="blue", padding=(1, 2)))
-    console.print(f"  [dim]Problem ID: {problem.id}[/dim]\n")
+    console.print(Group(
+        "",
+        Panel(body, title=header, title_align="left", border_style="blue", padding=(1, 2)),
+        f"  [dim]Problem ID: {problem.id}[/dim]\n",
+    ))
 
 
 @app.command()
@@ -64,7 +84,10 @@ def _parse_tags(tags: str | None) -> list[str] | None:
     """Parse comma-separated tags string into a list."""
     if not tags:
         return None
-    return [t.strip() for t in tags.split(",") if t.strip()]
+    if "," not in tags:
+        tag = tags.strip()
+        return [tag] if tag else None
+    return [t for t in (part.strip() for part in tags.split(",")) if t]
 
 
 @app.command()
@@ -141,10 +164,11 @@ def list_problems(
 
         info = review_info.get(p.id)
         if info:
-            next_date = date.fromisoformat(info["next_review_date"])
-            if next_date <= today:
+            days_until_due = info["days_until_due"]
+            next_date = today + timedelta(days=days_until_due)
+            if days_until_due <= 0:
                 review_str = Text("🔥 Due", style="bold red")
-            elif (next_date - today).days <= 3:
+            elif days_until_due <= 3:
                 review_str = Text(f"⏰ {next_date.strftime('%b %d')}", style="yellow")
             elif info["interval_days"] >= 14:
                 review_str = Text("✓ Mastered", style="green")
@@ -155,9 +179,7 @@ def list_problems(
 
         table.add_row(p.id, p.title, diff_text, review_str, tags)
 
-    console.print()
-    console.print(table)
-    console.print(f"\n  [dim]{len(problems)} problem(s) total[/dim]\n")
+    console.print(Group("", table, f"\n  [dim]{len(problems)} problem(s) total[/dim]\n"))
 
 
 @app.command()
@@ -172,14 +194,16 @@ def tags():
     for tag, count in tag_counts.items():
         lines.append(f"  [cyan]{tag}[/cyan] ({count} problem{'s' if count != 1 else ''})")
 
-    console.print()
-    console.print(Panel(
-        "\n".join(lines),
-        title="Available Tags",
-        border_style="blue",
-        padding=(1, 2),
+    console.print(Group(
+        "",
+        Panel(
+            "\n".join(lines),
+            title="Available Tags",
+            border_style="blue",
+            padding=(1, 2),
+        ),
+        "  [dim]Use [bold]prep list --tags <tag>[/bold] to filter by tag[/dim]\n",
     ))
-    console.print(f"  [dim]Use [bold]prep list --tags <tag>[/bold] to filter by tag[/dim]\n")
 
 
 @app.command()
@@ -230,9 +254,7 @@ def stats():
     except Exception:
         pass  # review_schedule table may not exist yet
 
-    console.print()
-    console.print(table)
-    console.print()
+    console.print(Group("", table, ""))
 
 
 @app.command()
@@ -252,28 +274,35 @@ def submit(
         console.print(f"[red]File not found:[/red] {file_path}")
         raise typer.Exit(code=1)
 
-    code = path.read_text(encoding="utf-8")
+    code = path.read_bytes().decode("utf-8")
     language = "python" if path.suffix in (".py", "") else path.suffix.lstrip(".")
 
     # Display the submitted code
-    header = Text()
-    header.append(problem.title, style="bold")
-    header.append("  ")
-    header.append_text(_difficulty_text(problem.difficulty))
-
-    console.print()
-    console.print(Panel(
-        Syntax(code, language, theme="monokai", line_numbers=True),
-        title=header,
-        title_align="left",
-        border_style="blue",
-        padding=(1, 2),
+    header = Text.assemble((problem.title, "bold"), "  ", _difficulty_text(problem.difficulty))
+
+    console.print(Group(
+        "",
+        Panel(
+            Syntax(code, _lexer_for(language), theme="monokai", line_numbers=True),
+            title=header,
+            title_align="left",
+            border_style="blue",
+            padding=(1, 2),
+        ),
     ))
 
-    # Call AI reviewer
+    # Call AI reviewer, showing the reply as it streams in
     try:
-        with console.status("[bold blue]Reviewing your code..."):
-            result = ai_reviewer.review_code(problem, code, language)
+        buffer = ""
+        with Live(console=console, transient=True) as live:
+            live.update(Panel("[dim]Waiting for response...[/dim]", title="Reviewing your code...", border_style="blue"))
+            for chunk in ai_reviewer.review_code_stream(problem, code, language):
+                buffer += chunk
+                # The reply is JSON; render only the feedback text that has arrived so far
+                feedback = ai_reviewer.partial_feedback(buffer)
+                if feedback:
+                    live.update(Panel(Markdown(feedback), title="Reviewing your code...", border_style="blue"))
+        result = ai_reviewer.parse_review(buffer)
     except ValueError as e:
         console.print(f"\n[red]{e}[/red]")
         database.save_submission(problem_id, code, language)
@@ -297,15 +326,16 @@ def submit(
     passed = result["passed"]
     badge = "[bold green]PASSED[/bold green]" if passed else "[bold red]NEEDS WORK[/bold red]"
 
-    console.print(f"\n  Result: {badge}")
-    console.print(f"  [dim]Time: {result['time_complexity']}  |  Space: {result['space_complexity']}[/dim]\n")
-
-    console.print(Panel(
-        Markdown(result["feedback"]),
-        title="AI Review",
-        title_align="left",
-        border_style="green" if passed else "red",
-        padding=(1, 2),
+    console.print(Group(
+        f"\n  Result: {badge}",
+        f"  [dim]Time: {result['time_complexity']}  |  Space: {result['space_complexity']}[/dim]\n",
+        Panel(
+            Markdown(result["feedback"]),
+            title="AI Review",
+            title_align="left",
+            border_style="green" if passed else "red",
+            padding=(1, 2),
+        ),
     ))
 
     # Offer to mark the problem for spaced repetition
@@ -327,6 +357,51 @@ def submit(
         console.print("\n")
 
 
+@app.command("review-all")
+def review_all():
+    """Run AI review on all submissions saved without feedback."""
+    pending = database.get_pending_submissions()
+    if not pending:
+        console.print("\n  [green]No submissions waiting for AI review.[/green]\n")
+        return
+
+    problems = {pid: database.get_problem(pid) for pid in {s.problem_id for s in pending}}
+
+    try:
+        with console.status(f"[bold blue]Reviewing {len(pending)} submission(s)..."):
+            results = ai_reviewer.bulk_review(
+                [(problems[s.problem_id], s.code, s.language) for s in pending]
+            )
+    except ValueError as e:
+        console.print(f"\n[red]{e}[/red]")
+        raise typer.Exit(code=1)
+
+    table = Table(title="AI Review Results", border_style="blue")
+    table.add_column("Problem", style="bold")
+    table.add_column("Submitted", style="cyan")
+    table.add_column("Result")
+    table.add_column("Time / Space", style="dim")
+
+    failed = 0
+    for sub, result in zip(pending, results):
+        date_str = str(sub.submitted_at)[:19] if sub.submitted_at else ""
+        if isinstance(result, Exception):
+            failed += 1
+            table.add_row(problems[sub.problem_id].title, date_str, Text("API error", style="red"), str(result)[:60])
+            continue
+
+        database.update_submission_review(sub.id, result["feedback"], result["passed"])
+        result_str = Text("Passed", style="green") if result["passed"] else Text("Needs Work", style="red")
+        table.add_row(
+            problems[sub.problem_id].title,
+            date_str,
+            result_str,
+            f"{result['time_complexity']} / {result['space_complexity']}",
+        )
+
+    console.print(Group("", table, f"\n  [dim]{len(pending) - failed} reviewed, {failed} failed[/dim]\n"))
+
+
 @app.command()
 def history(
     problem_id: str = typer.Argument(help="The problem ID to view history for"),
@@ -345,10 +420,7 @@ def history(
         console.print(f"[dim]Run [bold]prep submit {problem_id} <file>[/bold] to submit a solution.[/dim]")
         raise typer.Exit()
 
-    header = Text()
-    header.append(f"History: {problem.title}", style="bold")
-    header.append("  ")
-    header.append_text(_difficulty_text(problem.difficulty))
+    header = Text.assemble((f"History: {problem.title}", "bold"), "  ", _difficulty_text(problem.difficulty))
     console.print()
 
     if detailed:
@@ -434,19 +506,20 @@ def review():
         console.print("  [dim]Use [bold]prep mark <problem-id> solved[/bold] to schedule reviews.[/dim]\n")
         return
 
+    # Fetch schedule and success rate for all due problems in one query
+    dashboard = database.get_review_dashboard([p.id for p in due])
+    today = date.today()
+
     lines = []
     for i, problem in enumerate(due, 1):
         diff_color = DIFFICULTY_COLORS.get(problem.difficulty, "white")
-        passed, total = database.get_success_rate(problem.id)
-
-        review_info = database.get_next_review_date(problem.id)
-        # Get last_reviewed from review_info_for_problems
-        review_details = database.get_review_info_for_problems([problem.id]).get(problem.id)
-        last_reviewed = review_details["last_reviewed"] if review_details and review_details["last_reviewed"] else None
+        details = dashboard.get(problem.id, {})
+        passed, total = details.get("passed", 0), details.get("total", 0)
+        last_reviewed = details.get("last_reviewed")
 
         if last_reviewed:
             last_date = date.fromisoformat(last_reviewed)
-            days_ago = (date.today() - last_date).days
+            days_ago = (today - last_date).days
             if days_ago == 0:
                 last_str = "Today"
             elif days_ago == 1:
@@ -465,14 +538,16 @@ def review():
         lines.append(entry)
 
     body = "\n\n".join(lines)
-    console.print()
-    console.print(Panel(
-        body,
-        title=f"Due for Review ({len(due)} problem{'s' if len(due) != 1 else ''})",
-        border_style="yellow",
-        padding=(1, 2),
+    console.print(Group(
+        "",
+        Panel(
+            body,
+            title=f"Due for Review ({len(due)} problem{'s' if len(due) != 1 else ''})",
+            border_style="yellow",
+            padding=(1, 2),
+        ),
+        "  [dim]Use [bold]prep show <problem-id>[/bold] to practice[/dim]\n",
     ))
-    console.print("  [dim]Use [bold]prep show <problem-id>[/bold] to practice[/dim]\n")
 
 
 if __name__ == "__main__":
@@ -1,9 +1,14 @@
 import json
+import random
+import re
 import sqlite3
+import threading
 from contextlib import contextmanager
 from datetime import date, timedelta
 from pathlib import Path
 
+import orjson
+
 from .models import Problem, Submission
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
@@ -12,27 +17,127 @@ PROBLEMS_JSON = DATA_DIR / "problems.json"
 ADDITIONAL_PROBLEMS_JSON = DATA_DIR / "additional_problems.json"
 
 
+_conn: sqlite3.Connection | None = None
+_conn_path: Path | None = None
+_conn_lock = threading.RLock()
+
+
+# Tables and indexes added after the original problems/submissions/review_schedule schema.
+# init_db and _migrate both run this, so older databases pick them up without `prep init`.
+_ADDED_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        key TEXT PRIMARY KEY,
+        response TEXT NOT NULL,
+        model_id TEXT,
+        prompt_version TEXT,
+        created_at INTEGER NOT NULL,
+        expires_at INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS ix_llm_cache_expires ON llm_cache(expires_at);
+
+    CREATE TABLE IF NOT EXISTS problem_tags (
+        problem_id TEXT NOT NULL,
+        tag TEXT NOT NULL,
+        PRIMARY KEY (problem_id, tag),
+        FOREIGN KEY (problem_id) REFERENCES problems(id)
+    );
+    CREATE INDEX IF NOT EXISTS ix_problem_tags_tag ON problem_tags(tag);
+
+    CREATE INDEX IF NOT EXISTS ix_problems_difficulty ON problems(difficulty);
+    CREATE INDEX IF NOT EXISTS ix_subs_problem_time
+        ON submissions(problem_id, submitted_at DESC, id DESC);
+    CREATE INDEX IF NOT EXISTS ix_subs_passed ON submissions(passed) WHERE passed IS NOT NULL;
+    CREATE INDEX IF NOT EXISTS ix_rs_due ON review_schedule(next_review_date, problem_id);
+    CREATE INDEX IF NOT EXISTS ix_rs_last ON review_schedule(last_reviewed);
+"""
+_ADDED_OBJECTS = frozenset(re.findall(r"IF NOT EXISTS (\w+)", _ADDED_SCHEMA))
+_ORIGINAL_TABLES = frozenset({"problems", "submissions", "review_schedule"})
+
+# Index tags for problems loaded before problem_tags existed
+_BACKFILL_PROBLEM_TAGS = (
+    "INSERT OR IGNORE INTO problem_tags (problem_id, tag) "
+    "SELECT p.id, je.value FROM problems p, json_each(p.tags) je"
+)
+
+
+def _migrate(conn: sqlite3.Connection):
+    """Bring a database created by an older version up to date, without needing `prep init`.
+
+    A database with no tables yet is left for init_db.
+    """
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    if _ORIGINAL_TABLES <= names and not _ADDED_OBJECTS <= names:
+        conn.executescript(_ADDED_SCHEMA)
+        if "problem_tags" not in names:
+            conn.execute(_BACKFILL_PROBLEM_TAGS)
+
+
+def _get_conn() -> sqlite3.Connection:
+    """Return the shared connection, opening it on first use or after DB_PATH changes."""
+    global _conn, _conn_path
+    if _conn is None or _conn_path != DB_PATH:
+        _reset_connection()
+        # The shared connection keeps sqlite3's prepared-statement cache warm across calls.
+        # uri=True also accepts "file:" URIs, which tests use for in-memory databases.
+        conn = sqlite3.connect(
+            DB_PATH, check_same_thread=False, isolation_level=None, cached_statements=256, uri=True
+        )
+        conn.row_factory = sqlite3.Row
+        # journal_mode=WAL is persistent in the database file, so init_db sets it once
+        conn.execute("PRAGMA foreign_keys=ON")
+        # WAL keeps NORMAL crash-safe; the rest trade memory for fewer disk reads
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-64000")
+        conn.execute("PRAGMA mmap_size=268435456")
+        _migrate(conn)
+        _conn, _conn_path = conn, DB_PATH
+    return _conn
+
+
+def _reset_connection():
+    """Close the shared connection so the next query reopens it (used by test fixtures)."""
+    global _conn, _conn_path
+    with _conn_lock:
+        if _conn is not None:
+            _conn.close()
+        _conn, _conn_path = None, None
+
+
 @contextmanager
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
-    try:
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+def get_connection(immediate: bool = False):
+    """Yield the shared connection inside a transaction.
+
+    Nested use joins the outer transaction instead of starting a new one.
+    Pass immediate=True to take the write lock up front for bulk writes.
+    """
+    with _conn_lock:
+        conn = _get_conn()
+        if conn.in_transaction:
+            yield conn
+            return
+
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield conn
+            # executescript commits implicitly, so the transaction may already be closed
+            if conn.in_transaction:
+                conn.execute("COMMIT")
+        except BaseException:
+            # Includes KeyboardInterrupt/CancelledError: a transaction left open on the shared
+            # connection would make every later get_connection() join it and never commit.
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
 
 
 def init_db():
     DATA_DIR.mkdir(parents=True, exist_ok=True)
 
     with get_connection() as conn:
-        conn.executescript("""
+        conn.executescript(f"""
+            PRAGMA journal_mode=WAL;
+
             CREATE TABLE IF NOT EXISTS problems (
                 id TEXT PRIMARY KEY,
                 title TEXT NOT NULL,
@@ -61,23 +166,69 @@ def init_db():
                 last_reviewed DATE,
                 FOREIGN KEY (problem_id) REFERENCES problems(id)
             );
+
+            {_ADDED_SCHEMA}
         """)
+        conn.execute(_BACKFILL_PROBLEM_TAGS)
 
 
-def load_problems_from_json(path: Path | None = None) -> int:
-    path = path or PROBLEMS_JSON
-    with open(path) as f:
-        problems = json.load(f)
+def _validate_problems_json(conn: sqlite3.Connection, problems_json: str, path: Path):
+    """Reject a problems file that isn't a list of problems before anything is inserted.
 
-    count = 0
-    with get_connection() as conn:
-        for p in problems:
-            result = conn.execute(
+    Every entry needs id, title, description and difficulty; tags, if present, must be a list.
+
+    Raises:
+        ValueError: Naming the file and the index of the first bad entry.
+    """
+    if conn.execute("SELECT json_type(?)", (problems_json,)).fetchone()[0] != "array":
+        raise ValueError(f"Invalid problems file {path}: expected a JSON list of problems")
+
+    bad = conn.execute(
+        "SELECT key FROM json_each(?) "
+        "WHERE type IS NOT 'object' "
+        "OR json_extract(value, '$.id') IS NULL OR json_extract(value, '$.title') IS NULL "
+        "OR json_extract(value, '$.description') IS NULL "
+        "OR json_extract(value, '$.difficulty') IS NULL "
+        "OR json_type(value, '$.tags') NOT IN ('array', 'null') "
+        "LIMIT 1",
+        (problems_json,),
+    ).fetchone()
+    if bad is not None:
+        raise ValueError(
+            f"Invalid problems file {path}: entry {bad[0]} needs id, title, description "
+            "and difficulty, and tags must be a list"
+        )
+
+
+def load_problems_from_json(path: Path | None = None) -> int:
+    path = Path(path or PROBLEMS_JSON)
+    # The file text is bound as-is and SQLite parses it (json_each), so it is never
+    # decoded into Python objects.
+    problems_json = path.read_text(encoding="utf-8")
+    with get_connection(immediate=True) as conn:
+        try:
+            _validate_problems_json(conn, problems_json, path)
+
+            before = conn.total_changes
+            conn.execute(
                 "INSERT OR IGNORE INTO problems (id, title, description, difficulty, tags) "
-                "VALUES (?, ?, ?, ?, ?)",
-                (p["id"], p["title"], p["description"], p["difficulty"], json.dumps(p.get("tags", []))),
+                "SELECT json_extract(value, '$.id'), json_extract(value, '$.title'), "
+                "json_extract(value, '$.description'), json_extract(value, '$.difficulty'), "
+                "COALESCE(json_extract(value, '$.tags'), '[]') "
+                "FROM json_each(?)",
+                (problems_json,),
             )
-            count += result.rowcount
+            count = conn.total_changes - before
+
+            # Index tags from the stored rows, so problems that already existed keep their tags
+            conn.execute(
+                "INSERT OR IGNORE INTO problem_tags (problem_id, tag) "
+                "SELECT p.id, je.value FROM problems p, json_each(p.tags) je "
+                "WHERE p.id IN (SELECT json_extract(value, '$.id') FROM json_each(?))",
+                (problems_json,),
+            )
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid problems file {path}: {e}") from e
 
     return count
 
@@ -101,22 +252,44 @@ def _build_filter_clause(
         params.append(difficulty)
     if tags:
         for tag in tags:
-            clauses.append('tags LIKE ?')
-            params.append(f'%"{tag}"%')
+            clauses.append("id IN (SELECT problem_id FROM problem_tags WHERE tag = ?)")
+            params.append(tag)
     where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
     return where, params
 
 
+# Explicit column order for _problem_row; matches the Problem field order.
+_PROBLEM_COLUMNS = "id, title, description, difficulty, tags, created_at"
+
+
+def _problem_row(cursor: sqlite3.Cursor, row: tuple) -> Problem:
+    """Row factory that builds a Problem (tags decoded) from a _PROBLEM_COLUMNS tuple.
+
+    This is the only adapter from problems rows to Problem; select _PROBLEM_COLUMNS to use it.
+    """
+    return Problem(row[0], row[1], row[2], row[3], orjson.loads(row[4]) if row[4] else [], row[5])
+
+
+def _problem_cursor(conn: sqlite3.Connection) -> sqlite3.Cursor:
+    """Return a cursor on conn whose rows come back as Problem objects."""
+    cursor = conn.cursor()
+    cursor.row_factory = _problem_row
+    return cursor
+
+
 def get_random_problem(
     difficulty: str | None = None, tags: list[str] | None = None
 ) -> Problem | None:
     where, params = _build_filter_clause(difficulty, tags)
+    # Count the matches and seek to a random offset, instead of sorting them all by RANDOM()
     with get_connection() as conn:
-        row = conn.execute(
-            f"SELECT * FROM problems{where} ORDER BY RANDOM() LIMIT 1",
-            params,
+        count = conn.execute(f"SELECT COUNT(*) FROM problems{where}", params).fetchone()[0]
+        if count == 0:
+            return None
+        return _problem_cursor(conn).execute(
+            f"SELECT {_PROBLEM_COLUMNS} FROM problems{where} LIMIT 1 OFFSET ?",
+            params + [random.randrange(count)],
         ).fetchone()
-    return Problem.from_row(row) if row else None
 
 
 def list_problems(
@@ -124,21 +297,18 @@ def list_problems(
 ) -> list[Problem]:
     where, params = _build_filter_clause(difficulty, tags)
     with get_connection() as conn:
-        rows = conn.execute(
-            f"SELECT * FROM problems{where} ORDER BY difficulty, title",
+        return _problem_cursor(conn).execute(
+            f"SELECT {_PROBLEM_COLUMNS} FROM problems{where} ORDER BY difficulty, title",
             params,
         ).fetchall()
-    return [Problem.from_row(row) for row in rows]
 
 
 def get_problem(problem_id: str) -> Problem | None:
     with get_connection() as conn:
-        row = conn.execute(
-            "SELECT * FROM problems WHERE id = ?", (problem_id,)
+        return _problem_cursor(conn).execute(
+            f"SELECT {_PROBLEM_COLUMNS} FROM problems WHERE id = ?", (problem_id,)
         ).fetchone()
 
-    return Problem.from_row(row) if row else None
-
 
 def save_submission(
     problem_id: str,
@@ -158,18 +328,44 @@ def save_submission(
 
 def get_submissions(problem_id: str, limit: int = 20) -> list[Submission]:
     with get_connection() as conn:
-        rows = conn.execute(
-            "SELECT * FROM submissions WHERE problem_id = ? "
-            "ORDER BY submitted_at DESC, id DESC LIMIT ?",
-            (problem_id, limit),
-        ).fetchall()
+        return [
+            Submission.from_row(row)
+            for row in conn.execute(
+                "SELECT * FROM submissions WHERE problem_id = ? "
+                "ORDER BY submitted_at DESC, id DESC LIMIT ?",
+                (problem_id, limit),
+            )
+        ]
+
+
+def get_pending_submissions() -> list[Submission]:
+    """Get submissions saved without AI feedback, oldest first."""
+    with get_connection() as conn:
+        return [
+            Submission.from_row(row)
+            for row in conn.execute(
+                "SELECT * FROM submissions WHERE ai_feedback IS NULL "
+                "ORDER BY submitted_at ASC, id ASC"
+            )
+        ]
 
-    return [Submission.from_row(row) for row in rows]
+
+def update_submission_review(submission_id: int, ai_feedback: str, passed: bool) -> None:
+    """Attach AI feedback to an existing submission."""
+    with get_connection() as conn:
+        conn.execute(
+            "UPDATE submissions SET ai_feedback = ?, passed = ? WHERE id = ?",
+            (ai_feedback, passed, submission_id),
+        )
 
 
 def get_stats() -> dict:
     with get_connection() as conn:
-        total = conn.execute("SELECT COUNT(*) FROM problems").fetchone()[0]
+        totals = conn.execute(
+            "SELECT (SELECT COUNT(*) FROM problems) AS total_problems, "
+            "(SELECT COUNT(*) FROM submissions) AS total_submissions, "
+            "(SELECT COUNT(DISTINCT problem_id) FROM submissions) AS problems_attempted"
+        ).fetchone()
 
         difficulty_counts = {}
         for row in conn.execute(
@@ -177,60 +373,45 @@ def get_stats() -> dict:
         ):
             difficulty_counts[row["difficulty"]] = row["cnt"]
 
-        total_submissions = conn.execute(
-            "SELECT COUNT(*) FROM submissions"
-        ).fetchone()[0]
-
-        problems_attempted = conn.execute(
-            "SELECT COUNT(DISTINCT problem_id) FROM submissions"
-        ).fetchone()[0]
-
     return {
-        "total_problems": total,
+        "total_problems": totals["total_problems"],
         "by_difficulty": difficulty_counts,
-        "total_submissions": total_submissions,
-        "problems_attempted": problems_attempted,
+        "total_submissions": totals["total_submissions"],
+        "problems_attempted": totals["problems_attempted"],
     }
 
 
+# Spaced-repetition ladder 1 -> 3 -> 7 -> x2 from the stored interval; any failure resets to 1.
+# SET expressions all see the old row, so the UPSERT below repeats this for next_review_date.
+_NEXT_INTERVAL = (
+    "(CASE WHEN :success = 0 THEN 1 "
+    "WHEN interval_days = 1 THEN 3 "
+    "WHEN interval_days = 3 THEN 7 "
+    "ELSE interval_days * 2 END)"
+)
+
+
 def update_review_schedule(problem_id: str, success: bool) -> dict:
     """Update the review schedule based on performance.
 
     Returns dict with 'next_review_date' and 'interval_days'.
     """
-    today = date.today()
-
     with get_connection() as conn:
         row = conn.execute(
-            "SELECT * FROM review_schedule WHERE problem_id = ?",
-            (problem_id,),
-        ).fetchone()
-
-        if success:
-            if row is None:
-                interval_days = 1
-            elif row["interval_days"] == 1:
-                interval_days = 3
-            elif row["interval_days"] == 3:
-                interval_days = 7
-            else:
-                interval_days = row["interval_days"] * 2
-        else:
-            interval_days = 1
-
-        next_review = today + timedelta(days=interval_days)
-
-        conn.execute(
             "INSERT INTO review_schedule (problem_id, next_review_date, interval_days, last_reviewed) "
-            "VALUES (?, ?, ?, ?) "
+            "VALUES (:problem_id, date(:today, '+1 day'), 1, :today) "
             "ON CONFLICT(problem_id) DO UPDATE SET "
-            "next_review_date = excluded.next_review_date, "
-            "interval_days = excluded.interval_days, "
-            "last_reviewed = excluded.last_reviewed",
-            (problem_id, next_review.isoformat(), interval_days, today.isoformat()),
-        )
+            f"interval_days = {_NEXT_INTERVAL}, "
+            f"next_review_date = date(:today, '+' || {_NEXT_INTERVAL} || ' days'), "
+            "last_reviewed = :today "
+            "RETURNING next_review_date, interval_days",
+            {"problem_id": problem_id, "today": date.today().isoformat(), "success": int(success)},
+        ).fetchone()
 
-    return {"next_review_date": next_review, "interval_days": interval_days}
+    return {
+        "next_review_date": date.fromisoformat(row["next_review_date"]),
+        "interval_days": row["interval_days"],
+    }
 
 
 def get_due_reviews() -> list[Problem]:
@@ -238,16 +419,15 @@ def get_due_reviews() -> list[Problem]:
     today = date.today().isoformat()
 
     with get_connection() as conn:
-        rows = conn.execute(
-            "SELECT p.* FROM problems p "
+        # The problems columns don't clash with review_schedule's, so they need no prefix
+        return _problem_cursor(conn).execute(
+            f"SELECT {_PROBLEM_COLUMNS} FROM problems p "
             "JOIN review_schedule rs ON p.id = rs.problem_id "
             "WHERE rs.next_review_date <= ? "
             "ORDER BY rs.next_review_date ASC",
             (today,),
         ).fetchall()
 
-    return [Problem.from_row(row) for row in rows]
-
 
 def get_next_review_date(problem_id: str) -> str | None:
     """Get the next scheduled review date for a problem, or None."""
@@ -265,40 +445,34 @@ def get_review_stats() -> dict:
     today = date.today().isoformat()
 
     with get_connection() as conn:
-        due_today = conn.execute(
-            "SELECT COUNT(*) FROM review_schedule WHERE next_review_date <= ?",
+        row = conn.execute(
+            "WITH reviewed_dates AS ("
+            "SELECT DISTINCT last_reviewed FROM review_schedule WHERE last_reviewed IS NOT NULL) "
+            "SELECT (SELECT COUNT(*) FROM review_schedule WHERE next_review_date <= ?) AS due_today, "
+            "(SELECT COUNT(*) FROM review_schedule WHERE last_reviewed IS NOT NULL) AS total_reviewed, "
+            # Success rate from submissions that have been reviewed (passed is not null)
+            "(SELECT COUNT(*) FROM submissions WHERE passed IS NOT NULL) AS total_graded, "
+            "(SELECT SUM(CASE WHEN passed = 1 THEN 1 ELSE 0 END) FROM submissions "
+            "WHERE passed IS NOT NULL) AS total_passed, "
+            "(SELECT json_group_array(last_reviewed) FROM reviewed_dates) AS reviewed_dates",
             (today,),
-        ).fetchone()[0]
+        ).fetchone()
 
-        total_reviewed = conn.execute(
-            "SELECT COUNT(*) FROM review_schedule WHERE last_reviewed IS NOT NULL"
-        ).fetchone()[0]
+    total_graded = row["total_graded"]
+    total_passed = row["total_passed"] or 0
+    avg_success = round(total_passed / total_graded * 100) if total_graded > 0 else 0
+    reviewed_dates = set(json.loads(row["reviewed_dates"]))
 
-        # Success rate from submissions that have been reviewed (passed is not null)
-        result = conn.execute(
-            "SELECT COUNT(*) as total, SUM(CASE WHEN passed = 1 THEN 1 ELSE 0 END) as passed "
-            "FROM submissions WHERE passed IS NOT NULL"
-        ).fetchone()
-        total_graded = result["total"]
-        total_passed = result["passed"] or 0
-        avg_success = round(total_passed / total_graded * 100) if total_graded > 0 else 0
-
-        # Current streak: consecutive days with at least one review
-        streak = 0
-        check_date = date.today()
-        while True:
-            count = conn.execute(
-                "SELECT COUNT(*) FROM review_schedule WHERE last_reviewed = ?",
-                (check_date.isoformat(),),
-            ).fetchone()[0]
-            if count == 0:
-                break
-            streak += 1
-            check_date -= timedelta(days=1)
+    # Current streak: consecutive days with at least one review, ending today
+    streak = 0
+    check_date = date.today()
+    while check_date.isoformat() in reviewed_dates:
+        streak += 1
+        check_date -= timedelta(days=1)
 
     return {
-        "due_today": due_today,
-        "total_reviewed": total_reviewed,
+        "due_today": row["due_today"],
+        "total_reviewed": row["total_reviewed"],
         "avg_success_rate": avg_success,
         "current_streak": streak,
     }
@@ -307,16 +481,19 @@ def get_review_stats() -> dict:
 def get_review_info_for_problems(problem_ids: list[str]) -> dict[str, dict]:
     """Get review schedule info for a list of problem IDs.
 
-    Returns {problem_id: {'next_review_date': str, 'interval_days': int, 'last_reviewed': str}}.
+    Returns {problem_id: {'next_review_date': str, 'interval_days': int,
+    'last_reviewed': str, 'days_until_due': int}}. days_until_due is zero or
+    negative for problems that are due.
     """
     if not problem_ids:
         return {}
 
-    placeholders = ",".join("?" * len(problem_ids))
     with get_connection() as conn:
         rows = conn.execute(
-            f"SELECT * FROM review_schedule WHERE problem_id IN ({placeholders})",
-            problem_ids,
+            "SELECT *, CAST(julianday(next_review_date) - julianday(date('now', 'localtime')) AS INTEGER) "
+            "AS days_until_due FROM review_schedule "
+            "WHERE problem_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(problem_ids),),
         ).fetchall()
 
     return {
@@ -324,6 +501,43 @@ def get_review_info_for_problems(problem_ids: list[str]) -> dict[str, dict]:
             "next_review_date": row["next_review_date"],
             "interval_days": row["interval_days"],
             "last_reviewed": row["last_reviewed"],
+            "days_until_due": row["days_until_due"],
+        }
+        for row in rows
+    }
+
+
+def get_review_dashboard(problem_ids: list[str]) -> dict[str, dict]:
+    """Get schedule and success-rate info for scheduled problems in one query.
+
+    Returns {problem_id: {'last_reviewed': str, 'next_review_date': str,
+    'interval_days': int, 'passed': int, 'total': int}}.
+    """
+    if not problem_ids:
+        return {}
+
+    with get_connection() as conn:
+        rows = conn.execute(
+            "SELECT rs.*, COALESCE(s.passed, 0) AS passed, COALESCE(s.total, 0) AS total "
+            "FROM review_schedule rs "
+            "LEFT JOIN ("
+            "  SELECT problem_id, COUNT(*) AS total, "
+            "  SUM(CASE WHEN passed = 1 THEN 1 ELSE 0 END) AS passed "
+            "  FROM submissions WHERE passed IS NOT NULL "
+            "  AND problem_id IN (SELECT value FROM json_each(:ids)) "
+            "  GROUP BY problem_id"
+            ") s ON s.problem_id = rs.problem_id "
+            "WHERE rs.problem_id IN (SELECT value FROM json_each(:ids))",
+            {"ids": json.dumps(problem_ids)},
+        ).fetchall()
+
+    return {
+        row["problem_id"]: {
+            "last_reviewed": row["last_reviewed"],
+            "next_review_date": row["next_review_date"],
+            "interval_days": row["interval_days"],
+            "passed": row["passed"],
+            "total": row["total"],
         }
         for row in rows
     }
@@ -344,10 +558,9 @@ def get_success_rate(problem_id: str) -> tuple[int, int]:
 def get_all_tags() -> dict[str, int]:
     """Return {tag_name: problem_count} for all tags in the database."""
     with get_connection() as conn:
-        rows = conn.execute("SELECT tags FROM problems WHERE tags IS NOT NULL").fetchall()
-
-    counts: dict[str, int] = {}
-    for row in rows:
-        for tag in json.loads(row["tags"]):
-            counts[tag] = counts.get(tag, 0) + 1
-    return dict(sorted(counts.items(), key=lambda x: (-x[1], x[0])))
+        return {
+            row["tag"]: row["cnt"]
+            for row in conn.execute(
+                "SELECT tag, COUNT(*) AS cnt FROM problem_tags GROUP BY tag ORDER BY cnt DESC, tag ASC"
+            )
+        }
@@ -0,0 +1,53 @@
+"""On-disk cache for AI review responses, stored in the main SQLite database."""
+
+import json
+import sqlite3
+import time
+
+from . import database
+
+DEFAULT_TTL = 7 * 86400
+
+
+def _is_missing_table(error: sqlite3.OperationalError) -> bool:
+    """True if error means llm_cache doesn't exist yet (a database before `prep init`)."""
+    return str(error).startswith("no such table")
+
+
+def get(key: str) -> dict | None:
+    """Return the cached response for key, or None if missing or expired."""
+    try:
+        with database.get_connection() as conn:
+            row = conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND expires_at > ?",
+                (key, int(time.time())),
+            ).fetchone()
+    except sqlite3.OperationalError as e:
+        if not _is_missing_table(e):
+            raise
+        return None
+
+    return json.loads(row["response"]) if row else None
+
+
+def put(
+    key: str,
+    response: dict,
+    ttl: int = DEFAULT_TTL,
+    model_id: str | None = None,
+    prompt_version: str | None = None,
+) -> None:
+    """Store a response under key, replacing any previous entry and purging expired ones."""
+    now = int(time.time())
+    try:
+        with database.get_connection() as conn:
+            conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, response, model_id, prompt_version, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(response), model_id, prompt_version, now, now + ttl),
+            )
+    except sqlite3.OperationalError as e:
+        if not _is_missing_table(e):
+            raise
@@ -1,11 +1,10 @@
 from __future__ import annotations
 
-import json
 from dataclasses import dataclass, field
 from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class Problem:
     id: str
     title: str
@@ -14,17 +13,6 @@ class Problem:
     tags: list[str] = field(default_factory=list)
     created_at: datetime | None = None
 
-    @classmethod
-    def from_row(cls, row) -> Problem:
-        return cls(
-            id=row["id"],
-            title=row["title"],
-            description=row["description"],
-            difficulty=row["difficulty"],
-            tags=json.loads(row["tags"]) if row["tags"] else [],
-            created_at=row["created_at"],
-        )
-
     @classmethod
     def from_json(cls, data: dict) -> Problem:
         return cls(
@@ -36,7 +24,7 @@ class Problem:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Submission:
     id: int | None
     problem_id: str
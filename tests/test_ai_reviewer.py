@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import json
+from types import SimpleNamespace
+
+import dotenv
+import google.generativeai as genai
+import pytest
+
+from src import ai_reviewer, database
+from src.models import Problem
+
+# sha256 of the prompt built for PROBLEM/CODE below, per PROMPT_VERSION.
+# If this test fails after editing the prompt, bump PROMPT_VERSION and add its hash.
+PROMPT_HASHES = {
+    "v1": "01838a52c1cf89d427a5de35f1c59920af663a02c858e75cfc303af653272221",
+    "v2": "99a761cf675078b700d866633f0b3c27ec507ef6b5b2a3ce8d92a50bf515fc69",
+}
+
+PROBLEM = Problem(
+    id="two-sum",
+    title="Two Sum",
+    description="Find two numbers.",
+    difficulty="easy",
+)
+CODE = "def f(): pass"
+
+REPLY = json.dumps({
+    "feedback": "Solid approach.",
+    "passed": True,
+    "time_complexity": "O(n)",
+    "space_complexity": "O(n)",
+})
+
+
+@pytest.fixture(autouse=True)
+def isolate_api_key(monkeypatch):
+    """Each test sets its own GOOGLE_API_KEY: drop any cached key and never read a real .env."""
+    monkeypatch.setattr(ai_reviewer, "_api_key_cache", None)
+    monkeypatch.setattr(dotenv, "load_dotenv", lambda *args, **kwargs: False)
+
+
+@pytest.fixture
+def tmp_database(tmp_path, monkeypatch):
+    """Redirect the database (and so the review cache) to a temp directory."""
+    monkeypatch.setattr(database, "DB_PATH", tmp_path / "interview.db")
+    monkeypatch.setattr(database, "DATA_DIR", tmp_path)
+    database.init_db()
+    yield tmp_path
+    database._reset_connection()
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """Replace the Gemini client with one that streams REPLY in small chunks."""
+    calls = []
+
+    class FakeModel:
+        def __init__(self, model_id):
+            pass
+
+        def generate_content(self, prompt, generation_config=None, stream=False):
+            calls.append(prompt)
+            return [SimpleNamespace(text=REPLY[i:i + 7]) for i in range(0, len(REPLY), 7)]
+
+        async def generate_content_async(self, prompt, generation_config=None):
+            calls.append(asyncio.get_running_loop())
+            return SimpleNamespace(text=REPLY)
+
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(genai, "configure", lambda **kwargs: None)
+    monkeypatch.setattr(genai, "GenerativeModel", FakeModel)
+    ai_reviewer._get_model.cache_clear()
+    yield calls
+    ai_reviewer._get_model.cache_clear()
+
+
+class TestPromptVersion:
+    def test_prompt_change_requires_version_bump(self):
+        prompt = ai_reviewer._build_prompt(PROBLEM, CODE, "python")
+        digest = hashlib.sha256(prompt.encode()).hexdigest()
+        assert PROMPT_HASHES.get(ai_reviewer.PROMPT_VERSION) == digest
+
+
+class TestCacheKey:
+    def test_stable(self):
+        first = ai_reviewer._cache_key(PROBLEM, CODE, "python")
+        second = ai_reviewer._cache_key(PROBLEM, CODE, "python")
+        assert first == second
+
+    @pytest.mark.parametrize("attr", ["MODEL_ID", "PROMPT_VERSION"])
+    def test_changes_with_model_and_prompt_version(self, attr, monkeypatch):
+        before = ai_reviewer._cache_key(PROBLEM, CODE, "python")
+        monkeypatch.setattr(ai_reviewer, attr, "something-else")
+        assert ai_reviewer._cache_key(PROBLEM, CODE, "python") != before
+
+
+class TestBulkReview:
+    def test_results_in_input_order_with_failures(self, monkeypatch):
+        async def fake_review(problem, code, language="python"):
+            if code == "bad":
+                raise RuntimeError("API down")
+            return {"feedback": code, "passed": True}
+
+        monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+        monkeypatch.setattr(ai_reviewer, "review_code_async", fake_review)
+
+        results = ai_reviewer.bulk_review(
+            [(PROBLEM, "a", "python"), (PROBLEM, "bad", "python"), (PROBLEM, "c", "python")]
+        )
+        assert results[0]["feedback"] == "a"
+        assert isinstance(results[1], RuntimeError)
+        assert results[2]["feedback"] == "c"
+
+    def test_missing_api_key_raises(self, monkeypatch):
+        monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+        with pytest.raises(ValueError):
+            ai_reviewer.bulk_review([(PROBLEM, CODE, "python")])
+
+
+@pytest.mark.usefixtures("tmp_database")
+class TestReviewCodeStream:
+    def test_chunks_join_to_full_reply(self, fake_model):
+        chunks = list(ai_reviewer.review_code_stream(PROBLEM, CODE))
+        assert len(chunks) > 1
+        result = ai_reviewer.parse_review("".join(chunks))
+        assert result["passed"] is True
+        assert result["time_complexity"] == "O(n)"
+
+    def test_second_stream_served_from_cache(self, fake_model):
+        list(ai_reviewer.review_code_stream(PROBLEM, CODE))
+        chunks = list(ai_reviewer.review_code_stream(PROBLEM, CODE))
+        assert len(fake_model) == 1
+        assert ai_reviewer.parse_review("".join(chunks))["feedback"] == "Solid approach."
+
+    def test_invalid_reply_raises(self):
+        with pytest.raises(ValueError):
+            ai_reviewer.parse_review("not json")
+
+
+class TestPartialFeedback:
+    def test_empty_until_feedback_starts(self):
+        assert ai_reviewer.partial_feedback('{"feedb') == ""
+
+    def test_decodes_escapes_in_partial_value(self):
+        assert ai_reviewer.partial_feedback('{"feedback": "Good.\\n\\nUse a \\"set') == 'Good.\n\nUse a "set'
+
+    @pytest.mark.parametrize("cut", ["\\", "\\u00"])
+    def test_drops_incomplete_escape(self, cut):
+        assert ai_reviewer.partial_feedback('{"feedback": "Good' + cut) == "Good"
+
+    def test_complete_reply(self):
+        assert ai_reviewer.partial_feedback(REPLY) == "Solid approach."
+
+
+class TestGetModel:
+    def test_reused_per_model_and_key(self, fake_model):
+        first = ai_reviewer._get_model("m", "key-1")
+        assert ai_reviewer._get_model("m", "key-1") is first
+        assert ai_reviewer._get_model("m", "key-2") is not first
+
+
+@pytest.mark.usefixtures("tmp_database")
+class TestReviewCode:
+    def test_calls_share_one_event_loop(self, fake_model):
+        other = Problem(id="other", title="Other", description="", difficulty="easy")
+        ai_reviewer.review_code(PROBLEM, CODE)
+        ai_reviewer.review_code(other, CODE)
+        assert len(fake_model) == 2
+        assert fake_model[0] is fake_model[1]
+
+    def test_returns_parsed_review(self, fake_model):
+        result = ai_reviewer.review_code(PROBLEM, CODE)
+        assert result["feedback"] == "Solid approach."
+        assert result["passed"] is True
+
+
+class TestGetApiKey:
+    def test_cached_after_first_read(self, monkeypatch):
+        monkeypatch.setenv("GOOGLE_API_KEY", "first")
+        assert ai_reviewer._get_api_key() == "first"
+        monkeypatch.setenv("GOOGLE_API_KEY", "second")
+        assert ai_reviewer._get_api_key() == "first"
+
+
+class TestPreflight:
+    @pytest.mark.parametrize("code", ["", "   \n\t\n"])
+    def test_empty_submission(self, code):
+        assert ai_reviewer._preflight(code, "python")["feedback"] == "Empty submission."
+
+    def test_comment_only_python(self):
+        result = ai_reviewer._preflight("# TODO\n\n    # later\n", "python")
+        assert result["passed"] is False
+
+    def test_comment_only_uses_language_marker(self):
+        assert ai_reviewer._preflight("// TODO", "java") is not None
+        assert ai_reviewer._preflight("// TODO", "python") is None
+
+    def test_too_large(self):
+        code = "x = 1\n" * (ai_reviewer.MAX_CODE_CHARS // 6 + 1)
+        assert ai_reviewer._preflight(code, "python")["feedback"] == "Solution too large to review."
+
+    def test_real_code_passes_through(self):
+        assert ai_reviewer._preflight("# helper\ndef f(): pass", "python") is None
+
+    def test_review_skips_api_without_key(self, monkeypatch):
+        monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+        result = ai_reviewer.review_code(PROBLEM, "")
+        assert result["passed"] is False
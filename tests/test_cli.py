@@ -0,0 +1,22 @@
+from rich.console import Console
+from rich.syntax import Syntax
+
+from src import cli
+
+
+def _render(renderable) -> str:
+    console = Console(width=60, color_system=None, record=True)
+    console.print(renderable)
+    return console.export_text()
+
+
+class TestLexerFor:
+    def test_matches_syntax_own_lexer(self):
+        code = "\n\ndef f():\n\treturn 1\n\n"
+        cached = Syntax(code, cli._lexer_for("python"), line_numbers=True)
+        expected = Syntax(code, "python", line_numbers=True)
+        assert _render(cached) == _render(expected)
+        assert "3 def f():" in _render(cached)
+
+    def test_unknown_language_is_plain_text(self):
+        assert cli._lexer_for("no-such-language") == "no-such-language"
@@ -1,10 +1,11 @@
 import json
+import sqlite3
 import tempfile
 from pathlib import Path
 
 import pytest
 
-from src import database
+from src import database, llm_cache
 from src.models import Problem, Submission
 
 
@@ -43,7 +44,8 @@ def tmp_database(tmp_path, monkeypatch):
     problems_file.write_text(json.dumps(problems))
     monkeypatch.setattr(database, "PROBLEMS_JSON", problems_file)
 
-    return tmp_path
+    yield tmp_path
+    database._reset_connection()
 
 
 class TestInitDb:
@@ -59,11 +61,124 @@ class TestInitDb:
         assert "problems" in table_names
         assert "submissions" in table_names
         assert "review_schedule" in table_names
+        assert "problem_tags" in table_names
 
     def test_idempotent(self):
         database.init_db()
         database.init_db()  # Should not raise
 
+    def test_enables_wal_persistently(self):
+        database.init_db()
+        database._reset_connection()
+        conn = sqlite3.connect(database.DB_PATH)
+        try:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        finally:
+            conn.close()
+
+    def test_backfills_problem_tags(self):
+        database.init_db()
+        database.load_problems_from_json()
+        with database.get_connection() as conn:
+            conn.execute("DELETE FROM problem_tags")
+
+        database.init_db()
+        assert database.get_all_tags()["arrays"] == 1
+
+
+def _create_original_schema():
+    """Build a database the way versions before problem_tags/llm_cache did, with one problem."""
+    conn = sqlite3.connect(database.DB_PATH)
+    conn.executescript("""
+        CREATE TABLE problems (id TEXT PRIMARY KEY, title TEXT NOT NULL,
+            description TEXT NOT NULL, difficulty TEXT, tags TEXT, created_at TIMESTAMP);
+        CREATE TABLE submissions (id INTEGER PRIMARY KEY AUTOINCREMENT, problem_id TEXT NOT NULL,
+            code TEXT NOT NULL, language TEXT, ai_feedback TEXT, passed BOOLEAN, submitted_at TIMESTAMP);
+        CREATE TABLE review_schedule (problem_id TEXT PRIMARY KEY, next_review_date DATE NOT NULL,
+            interval_days INTEGER DEFAULT 1, ease_factor REAL DEFAULT 2.5, last_reviewed DATE);
+        INSERT INTO problems (id, title, description, difficulty, tags)
+            VALUES ('two-sum', 'Two Sum', 'Find two.', 'easy', '["arrays"]');
+    """)
+    conn.close()
+
+
+class TestMigrate:
+    def test_adds_problem_tags_to_old_database(self):
+        _create_original_schema()
+
+        assert database.get_all_tags() == {"arrays": 1}
+        assert [p.id for p in database.list_problems(tags=["arrays"])] == ["two-sum"]
+
+    def test_adds_llm_cache_and_indexes_to_old_database(self):
+        _create_original_schema()
+
+        llm_cache.put("k", {"feedback": "ok"})
+        assert llm_cache.get("k") == {"feedback": "ok"}
+        with database.get_connection() as conn:
+            names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+        assert database._ADDED_OBJECTS <= names
+
+    def test_leaves_empty_database_alone(self):
+        with database.get_connection() as conn:
+            tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+        assert tables == []
+
+
+class TestGetConnection:
+    def test_reuses_one_connection(self):
+        with database.get_connection() as first:
+            pass
+        with database.get_connection() as second:
+            pass
+        assert first is second
+
+    def test_reopens_when_db_path_changes(self, tmp_path, monkeypatch):
+        with database.get_connection() as first:
+            pass
+        monkeypatch.setattr(database, "DB_PATH", tmp_path / "other.db")
+        with database.get_connection() as second:
+            pass
+        assert first is not second
+
+    def test_rolls_back_on_error(self):
+        database.init_db()
+        database.load_problems_from_json()
+
+        with pytest.raises(RuntimeError):
+            with database.get_connection() as conn:
+                conn.execute("UPDATE problems SET title = 'changed'")
+                raise RuntimeError("boom")
+
+        assert database.get_problem("test-easy").title == "Test Easy"
+
+    def test_interrupt_rolls_back_and_later_writes_commit(self):
+        database.init_db()
+        database.load_problems_from_json()
+
+        with pytest.raises(KeyboardInterrupt):
+            with database.get_connection() as conn:
+                conn.execute("UPDATE problems SET title = 'changed'")
+                raise KeyboardInterrupt
+
+        database.save_submission("test-easy", "code")
+        database._reset_connection()  # Read back through a fresh connection
+        assert database.get_problem("test-easy").title == "Test Easy"
+        assert len(database.get_submissions("test-easy")) == 1
+
+    def test_nested_use_joins_outer_transaction(self):
+        database.init_db()
+        database.load_problems_from_json()
+
+        with pytest.raises(RuntimeError):
+            with database.get_connection() as conn:
+                conn.execute("UPDATE problems SET title = 'outer' WHERE id = 'test-easy'")
+                with database.get_connection() as inner:
+                    inner.execute("UPDATE problems SET title = 'inner' WHERE id = 'test-hard'")
+                raise RuntimeError("boom")
+
+        assert database.get_problem("test-easy").title == "Test Easy"
+        assert database.get_problem("test-hard").title == "Test Hard"
+
 
 class TestLoadProblems:
     def test_loads_problems(self):
@@ -78,6 +193,35 @@ class TestLoadProblems:
         assert first == 3
         assert second == 0  # INSERT OR IGNORE — no new rows
 
+    @pytest.mark.parametrize("entry", [
+        {"title": "No Id", "description": "d", "difficulty": "easy"},
+        {"id": "bad-tags", "title": "T", "description": "d", "difficulty": "easy", "tags": "arrays"},
+        "not-a-problem",
+    ])
+    def test_invalid_entry_raises(self, tmp_path, entry):
+        database.init_db()
+        valid = {"id": "ok", "title": "Ok", "description": "d", "difficulty": "easy"}
+        bad = tmp_path / "bad.json"
+        bad.write_text(json.dumps([valid, entry]))
+        with pytest.raises(ValueError, match="entry 1"):
+            database.load_problems_from_json(bad)
+        assert database.list_problems() == []
+
+    def test_non_list_file_raises(self, tmp_path):
+        database.init_db()
+        bad = tmp_path / "bad.json"
+        bad.write_text(json.dumps({"id": "x"}))
+        with pytest.raises(ValueError):
+            database.load_problems_from_json(bad)
+
+    def test_malformed_file_raises(self, tmp_path):
+        database.init_db()
+        bad = tmp_path / "bad.json"
+        bad.write_text('[{"id": "x",')
+        with pytest.raises(ValueError):
+            database.load_problems_from_json(bad)
+        assert database.list_problems() == []
+
 
 class TestGetRandomProblem:
     def test_returns_a_problem(self):
@@ -176,6 +320,31 @@ class TestSubmissions:
         assert subs == []
 
 
+class TestPendingSubmissions:
+    def test_only_unreviewed_oldest_first(self):
+        database.init_db()
+        database.load_problems_from_json()
+
+        database.save_submission("test-easy", "first")
+        database.save_submission("test-easy", "reviewed", "python", "fb", True)
+        database.save_submission("test-medium", "second")
+
+        pending = database.get_pending_submissions()
+        assert [s.code for s in pending] == ["first", "second"]
+
+    def test_update_submission_review(self):
+        database.init_db()
+        database.load_problems_from_json()
+
+        sub_id = database.save_submission("test-easy", "code")
+        database.update_submission_review(sub_id, "Looks good.", True)
+
+        assert database.get_pending_submissions() == []
+        sub = database.get_submissions("test-easy")[0]
+        assert sub.ai_feedback == "Looks good."
+        assert sub.passed is True
+
+
 class TestGetStats:
     def test_stats_shape(self):
         database.init_db()
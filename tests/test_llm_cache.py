@@ -0,0 +1,74 @@
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+from src import database, llm_cache
+
+
+@pytest.fixture(autouse=True)
+def tmp_database(tmp_path, monkeypatch):
+    """Redirect the database to a temp directory for each test."""
+    monkeypatch.setattr(database, "DB_PATH", tmp_path / "interview.db")
+    monkeypatch.setattr(database, "DATA_DIR", tmp_path)
+    database.init_db()
+    yield tmp_path
+    database._reset_connection()
+
+
+RESPONSE = {
+    "feedback": "Nice work.",
+    "passed": True,
+    "time_complexity": "O(n)",
+    "space_complexity": "O(1)",
+}
+
+
+class TestLlmCache:
+    def test_miss_returns_none(self):
+        assert llm_cache.get("missing") is None
+
+    def test_put_then_get(self):
+        llm_cache.put("k", RESPONSE)
+        assert llm_cache.get("k") == RESPONSE
+
+    def test_put_replaces_existing(self):
+        llm_cache.put("k", RESPONSE)
+        llm_cache.put("k", {**RESPONSE, "passed": False})
+        assert llm_cache.get("k")["passed"] is False
+
+    def test_expired_entry_is_a_miss(self):
+        llm_cache.put("k", RESPONSE, ttl=0)
+        assert llm_cache.get("k") is None
+
+    def test_put_purges_expired_entries(self):
+        llm_cache.put("old", RESPONSE, ttl=0)
+        llm_cache.put("new", RESPONSE)
+        with database.get_connection() as conn:
+            keys = [row["key"] for row in conn.execute("SELECT key FROM llm_cache")]
+        assert keys == ["new"]
+
+    def test_other_database_errors_propagate(self, monkeypatch):
+        @contextmanager
+        def locked_connection(immediate=False):
+            raise sqlite3.OperationalError("database is locked")
+            yield
+
+        monkeypatch.setattr(database, "get_connection", locked_connection)
+        with pytest.raises(sqlite3.OperationalError):
+            llm_cache.get("k")
+        with pytest.raises(sqlite3.OperationalError):
+            llm_cache.put("k", RESPONSE)
+
+    def test_stores_model_and_prompt_version(self):
+        llm_cache.put("k", RESPONSE, model_id="m", prompt_version="v9")
+        with database.get_connection() as conn:
+            row = conn.execute(
+                "SELECT model_id, prompt_version FROM llm_cache WHERE key = ?", ("k",)
+            ).fetchone()
+        assert (row["model_id"], row["prompt_version"]) == ("m", "v9")
+
+    def test_missing_table_is_a_miss(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(database, "DB_PATH", tmp_path / "uninitialized.db")
+        llm_cache.put("k", RESPONSE)  # Should not raise
+        assert llm_cache.get("k") is None
@@ -42,7 +42,8 @@ def tmp_database(tmp_path, monkeypatch):
 
     database.init_db()
     database.load_problems_from_json()
-    return tmp_path
+    yield tmp_path
+    database._reset_connection()
 
 
 class TestUpdateReviewSchedule:
@@ -195,6 +196,19 @@ class TestGetReviewStats:
         stats = database.get_review_stats()
         assert stats["current_streak"] == 2
 
+    def test_streak_stops_at_gap(self):
+        today = date.today()
+        database.update_review_schedule("two-sum", success=True)  # reviewed today
+        with database.get_connection() as conn:
+            conn.execute(
+                "INSERT INTO review_schedule (problem_id, next_review_date, interval_days, last_reviewed) "
+                "VALUES (?, ?, ?, ?)",
+                ("valid-parens", today.isoformat(), 1, (today - timedelta(days=2)).isoformat()),
+            )
+
+        stats = database.get_review_stats()
+        assert stats["current_streak"] == 1
+
     def test_success_rate_calculated(self):
         database.save_submission("two-sum", "code1", "python", "Good", True)
         database.save_submission("two-sum", "code2", "python", "Bad", False)
@@ -237,3 +251,36 @@ class TestGetReviewInfoForProblems:
         assert "two-sum" in info
         assert "valid-parens" not in info
         assert info["two-sum"]["interval_days"] == 1
+        assert info["two-sum"]["days_until_due"] == 1
+
+    def test_days_until_due_for_overdue(self):
+        database.update_review_schedule("two-sum", success=True)
+        two_days_ago = (date.today() - timedelta(days=2)).isoformat()
+        with database.get_connection() as conn:
+            conn.execute(
+                "UPDATE review_schedule SET next_review_date = ? WHERE problem_id = ?",
+                (two_days_ago, "two-sum"),
+            )
+
+        info = database.get_review_info_for_problems(["two-sum"])
+        assert info["two-sum"]["days_until_due"] == -2
+
+
+class TestGetReviewDashboard:
+    def test_empty_list(self):
+        assert database.get_review_dashboard([]) == {}
+
+    def test_combines_schedule_and_success_rate(self):
+        database.update_review_schedule("two-sum", success=True)
+        database.update_review_schedule("valid-parens", success=True)
+        database.save_submission("two-sum", "code", "python", "Good", True)
+        database.save_submission("two-sum", "code", "python", "Bad", False)
+        database.save_submission("two-sum", "code", "python")  # ungraded
+
+        info = database.get_review_dashboard(["two-sum", "valid-parens", "longest-substring"])
+        assert set(info) == {"two-sum", "valid-parens"}
+        assert info["two-sum"]["passed"] == 1
+        assert info["two-sum"]["total"] == 2
+        assert info["two-sum"]["interval_days"] == 1
+        assert info["two-sum"]["last_reviewed"] == date.today().isoformat()
+        assert info["valid-parens"]["total"] == 0
@@ -1,4 +1,7 @@
 import json
+import os
+import shutil
+import sqlite3
 
 import pytest
 
@@ -6,114 +9,132 @@ from src import database
 from src.models import Problem
 
 
-@pytest.fixture(autouse=True)
-def tmp_database(tmp_path, monkeypatch):
-    """Redirect database and problems.json to a temp directory for each test."""
-    db_path = tmp_path / "interview.db"
-    monkeypatch.setattr(database, "DB_PATH", db_path)
-    monkeypatch.setattr(database, "DATA_DIR", tmp_path)
-
-    problems = [
-        {
-            "id": "two-sum",
-            "title": "Two Sum",
-            "description": "Find two numbers.",
-            "difficulty": "easy",
-            "tags": ["arrays", "hash-table"],
-        },
-        {
-            "id": "reverse-string",
-            "title": "Reverse String",
-            "description": "Reverse a string.",
-            "difficulty": "easy",
-            "tags": ["strings", "two-pointers"],
-        },
-        {
-            "id": "three-sum",
-            "title": "3Sum",
-            "description": "Find three numbers.",
-            "difficulty": "medium",
-            "tags": ["arrays", "two-pointers", "sorting"],
-        },
-        {
-            "id": "number-of-islands",
-            "title": "Number of Islands",
-            "description": "Count islands.",
-            "difficulty": "medium",
-            "tags": ["graphs", "dfs", "bfs"],
-        },
-        {
-            "id": "merge-k-sorted-lists",
-            "title": "Merge K Sorted Lists",
-            "description": "Merge k lists.",
-            "difficulty": "hard",
-            "tags": ["linked-list", "heap"],
-        },
-    ]
-    problems_file = tmp_path / "problems.json"
-    problems_file.write_text(json.dumps(problems))
-    monkeypatch.setattr(database, "PROBLEMS_JSON", problems_file)
-
-    # No additional file by default
-    monkeypatch.setattr(database, "ADDITIONAL_PROBLEMS_JSON", tmp_path / "additional.json")
-
+PROBLEMS = (
+    Problem("two-sum", "Two Sum", "Find two numbers.", "easy", ["arrays", "hash-table"]),
+    Problem("reverse-string", "Reverse String", "Reverse a string.", "easy", ["strings", "two-pointers"]),
+    Problem("three-sum", "3Sum", "Find three numbers.", "medium", ["arrays", "two-pointers", "sorting"]),
+    Problem("number-of-islands", "Number of Islands", "Count islands.", "medium", ["graphs", "dfs", "bfs"]),
+    Problem("merge-k-sorted-lists", "Merge K Sorted Lists", "Merge k lists.", "hard", ["linked-list", "heap"]),
+)
+
+# Serialized once for the tests that load problems.json from disk
+PROBLEMS_JSON_BYTES = json.dumps([
+    {"id": p.id, "title": p.title, "description": p.description, "difficulty": p.difficulty, "tags": p.tags}
+    for p in PROBLEMS
+]).encode()
+
+
+def _seed_db(conn, problems=PROBLEMS):
+    """Insert problems (and their tag index rows) directly, bypassing problems.json."""
+    conn.executemany(
+        "INSERT INTO problems (id, title, description, difficulty, tags) VALUES (?, ?, ?, ?, ?)",
+        [(p.id, p.title, p.description, p.difficulty, json.dumps(p.tags)) for p in problems],
+    )
+    conn.executemany(
+        "INSERT INTO problem_tags (problem_id, tag) VALUES (?, ?)",
+        [(p.id, tag) for p in problems for tag in p.tags],
+    )
+
+
+def _memory_db(name):
+    """URI of a named in-memory database, which lives while any connection to it is open."""
+    return f"file:{name}?mode=memory&cache=shared"
+
+
+def _patch_db_paths(mp, *, DB_PATH, DATA_DIR, PROBLEMS_JSON, ADDITIONAL_PROBLEMS_JSON):
+    """Patch all of database's path settings at once; each one must be given."""
+    for name, value in {
+        "DB_PATH": DB_PATH,
+        "DATA_DIR": DATA_DIR,
+        "PROBLEMS_JSON": PROBLEMS_JSON,
+        "ADDITIONAL_PROBLEMS_JSON": ADDITIONAL_PROBLEMS_JSON,
+    }.items():
+        mp.setattr(database, name, value)
+
+
+def _setup_database(tmp_path, mp, db_name):
+    """Point the database at an in-memory db and the problem files at tmp_path, then create it."""
+    _patch_db_paths(
+        mp,
+        DB_PATH=_memory_db(db_name),
+        DATA_DIR=tmp_path,
+        PROBLEMS_JSON=tmp_path / "problems.json",
+        ADDITIONAL_PROBLEMS_JSON=tmp_path / "additional.json",  # No additional file by default
+    )
     database.init_db()
-    database.load_problems_from_json()
-    return tmp_path
 
 
+@pytest.fixture(scope="module")
+def seeded_db(tmp_path_factory):
+    """One database seeded with PROBLEMS, shared by the tests that only read from it."""
+    # Tests using empty_db close the shared connection; this one keeps the db alive.
+    keep_alive = sqlite3.connect(_memory_db("tags-shared"), uri=True)
+    with pytest.MonkeyPatch.context() as mp:
+        _setup_database(tmp_path_factory.mktemp("tags"), mp, "tags-shared")
+        with database.get_connection() as conn:
+            _seed_db(conn)
+        yield
+        database._reset_connection()
+    keep_alive.close()
+
+
+@pytest.fixture(scope="session")
+def canonical_problems_json(tmp_path_factory):
+    """problems.json written once per session, for tests to link into their own tmp_path."""
+    path = tmp_path_factory.mktemp("seed") / "problems.json"
+    path.write_bytes(PROBLEMS_JSON_BYTES)
+    return path
+
+
+@pytest.fixture
+def empty_db(tmp_path, monkeypatch, canonical_problems_json):
+    """A per-test database with the schema but no problems, and a problems.json to load."""
+    _setup_database(tmp_path, monkeypatch, "tags-test")
+    try:
+        os.link(canonical_problems_json, database.PROBLEMS_JSON)
+    except OSError:  # No hardlinks on this filesystem
+        shutil.copyfile(canonical_problems_json, database.PROBLEMS_JSON)
+    yield tmp_path
+    database._reset_connection()
+
+
+# (difficulty, tags, ids of the PROBLEMS matching both filters in list_problems order,
+# which is by difficulty then title)
+TAG_FILTER_CASES = [
+    (None, ["arrays"], ["two-sum", "three-sum"]),
+    # Only three-sum has both arrays and two-pointers (AND logic)
+    (None, ["arrays", "two-pointers"], ["three-sum"]),
+    ("easy", ["arrays"], ["two-sum"]),
+    (None, ["nonexistent-tag"], []),
+    ("hard", ["arrays"], []),
+]
+
+
+@pytest.mark.usefixtures("seeded_db")
 class TestGetRandomProblemWithTags:
-    def test_single_tag(self):
-        for _ in range(10):
-            p = database.get_random_problem(tags=["arrays"])
+    @pytest.mark.parametrize("difficulty,tags,expected", TAG_FILTER_CASES)
+    def test_filters(self, difficulty, tags, expected):
+        p = database.get_random_problem(difficulty=difficulty, tags=tags)
+        if expected:
             assert p is not None
-            assert "arrays" in p.tags
-
-    def test_multiple_tags_and_logic(self):
-        p = database.get_random_problem(tags=["arrays", "two-pointers"])
-        assert p is not None
-        # Only three-sum has both arrays and two-pointers
-        assert p.id == "three-sum"
-
-    def test_tag_with_difficulty(self):
-        p = database.get_random_problem(difficulty="easy", tags=["arrays"])
-        assert p is not None
-        assert p.id == "two-sum"
-
-    def test_no_match_returns_none(self):
-        p = database.get_random_problem(tags=["nonexistent-tag"])
-        assert p is None
-
-    def test_no_match_combo_returns_none(self):
-        p = database.get_random_problem(difficulty="hard", tags=["arrays"])
-        assert p is None
+            assert p.id in expected
+        else:
+            assert p is None
 
 
+@pytest.mark.usefixtures("seeded_db")
 class TestListProblemsWithTags:
-    def test_single_tag(self):
-        problems = database.list_problems(tags=["arrays"])
-        ids = {p.id for p in problems}
-        assert ids == {"two-sum", "three-sum"}
-
-    def test_multiple_tags(self):
-        problems = database.list_problems(tags=["arrays", "two-pointers"])
-        assert len(problems) == 1
-        assert problems[0].id == "three-sum"
-
-    def test_tag_with_difficulty(self):
-        problems = database.list_problems(difficulty="easy", tags=["arrays"])
-        assert len(problems) == 1
-        assert problems[0].id == "two-sum"
-
-    def test_no_match(self):
-        problems = database.list_problems(tags=["nonexistent"])
-        assert problems == []
+    @pytest.mark.parametrize("difficulty,tags,expected", TAG_FILTER_CASES)
+    def test_filters(self, difficulty, tags, expected):
+        problems = database.list_problems(difficulty=difficulty, tags=tags)
+        assert [p.id for p in problems] == expected
 
     def test_no_tags_returns_all(self):
         problems = database.list_problems()
         assert len(problems) == 5
 
 
+@pytest.mark.usefixtures("seeded_db")
 class TestGetAllTags:
     def test_returns_all_tags_with_counts(self):
         tags = database.get_all_tags()
@@ -122,20 +143,17 @@ class TestGetAllTags:
         assert tags["graphs"] == 1
         assert tags["heap"] == 1
 
-    def test_sorted_by_count_desc(self):
-        tags = database.get_all_tags()
+        # Sorted by count, most common first
         counts = list(tags.values())
         assert counts == sorted(counts, reverse=True)
 
-    def test_empty_db(self, tmp_path, monkeypatch):
-        # Use a fresh db with no problems
-        fresh_db = tmp_path / "fresh.db"
-        monkeypatch.setattr(database, "DB_PATH", fresh_db)
-        database.init_db()
+    @pytest.mark.usefixtures("empty_db")
+    def test_empty_db(self):
         tags = database.get_all_tags()
         assert tags == {}
 
 
+@pytest.mark.usefixtures("empty_db")
 class TestLoadAllProblems:
     def test_loads_both_files(self, tmp_path, monkeypatch):
         additional = [
@@ -151,10 +169,6 @@ class TestLoadAllProblems:
         additional_file.write_text(json.dumps(additional))
         monkeypatch.setattr(database, "ADDITIONAL_PROBLEMS_JSON", additional_file)
 
-        # Re-init to clear, then load all
-        fresh_db = tmp_path / "both.db"
-        monkeypatch.setattr(database, "DB_PATH", fresh_db)
-        database.init_db()
         count = database.load_all_problems()
 
         # 5 from problems.json + 1 from additional.json
@@ -166,8 +180,5 @@ class TestLoadAllProblems:
         # Point to non-existent additional file
         monkeypatch.setattr(database, "ADDITIONAL_PROBLEMS_JSON", tmp_path / "nope.json")
 
-        fresh_db = tmp_path / "only_main.db"
-        monkeypatch.setattr(database, "DB_PATH", fresh_db)
-        database.init_db()
         count = database.load_all_problems()
         assert count == 5  # Only main file